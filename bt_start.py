@@ -7,33 +7,51 @@
 
 import os
 import sys
+import shutil
 import logging
+import importlib.util
 from pathlib import Path
 
-# 设置基本日志
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("olmocr_startup.log", encoding='utf-8'),
-    ]
-)
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
 logger = logging.getLogger("olmocr_startup")
 
+def setup_startup_logging():
+    """设置启动日志，处理器统一由config.setup_logging安装"""
+    try:
+        from config import LoggingConfig, setup_logging
+    except Exception as e:
+        # 依赖缺失时配置模块无法导入，仅输出到控制台
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        logger.warning(f"加载配置模块失败，日志仅输出到控制台: {e}")
+        return
+    
+    setup_logging(LoggingConfig(level="INFO", file="olmocr_startup.log", format=LOG_FORMAT))
+
+# 发行包名与导入名不一致的依赖
+IMPORT_NAMES = {
+    "python-multipart": "multipart",
+    "pyjwt": "jwt",
+    "pyyaml": "yaml",
+    "python-dotenv": "dotenv",
+    "argon2-cffi": "argon2",
+}
+
 def check_dependencies():
     """检查必要的依赖是否已安装"""
     required_packages = [
-        "fastapi", "uvicorn", "python-multipart", "python-jose", 
-        "passlib", "olmocr", "pyyaml", "python-dotenv"
+        "fastapi", "uvicorn", "python-multipart", "pyjwt", 
+        "passlib", "argon2-cffi", "olmocr", "pyyaml", "python-dotenv",
+        "aiofiles", "orjson", "cachetools", "slowapi"
     ]
     
     missing_packages = []
     
     for package in required_packages:
-        try:
-            __import__(package.split("[")[0])  # 处理如 'python-jose[cryptography]' 的情况
-        except ImportError:
+        name = package.split("[")[0]  # 处理如 'pyjwt[crypto]' 的情况
+        module_name = IMPORT_NAMES.get(name, name.replace("-", "_"))
+        # 只查找模块规格，不执行包的__init__
+        if importlib.util.find_spec(module_name) is None:
             missing_packages.append(package)
     
     if missing_packages:
@@ -43,31 +61,26 @@ def check_dependencies():
     
     return True
 
+def _ensure_from_example(target, example):
+    """目标文件不存在时从示例文件复制，返回目标文件是否可用"""
+    if target.exists():
+        return True
+    if not example.exists():
+        return False
+    logger.warning(f"{target} 不存在，从示例 {example} 创建...")
+    shutil.copyfile(example, target)
+    logger.info(f"已创建 {target}，请检查并编辑配置!")
+    return True
+
 def check_config_files():
     """检查配置文件是否存在，如果不存在则创建示例文件"""
     config_yaml = Path("config.yaml")
-    env_file = Path(".env")
-    
-    if not config_yaml.exists():
-        example_file = Path("config.yaml.example")
-        if example_file.exists():
-            logger.warning(f"配置文件 {config_yaml} 不存在，从示例创建...")
-            with open(example_file, "r", encoding="utf-8") as src:
-                with open(config_yaml, "w", encoding="utf-8") as dst:
-                    dst.write(src.read())
-            logger.info(f"已创建配置文件 {config_yaml}，请检查并编辑配置!")
-        else:
-            logger.error(f"配置文件 {config_yaml} 和示例文件都不存在!")
-            return False
     
-    if not env_file.exists():
-        example_file = Path(".env.example")
-        if example_file.exists():
-            logger.warning(f"环境变量文件 {env_file} 不存在，从示例创建...")
-            with open(example_file, "r", encoding="utf-8") as src:
-                with open(env_file, "w", encoding="utf-8") as dst:
-                    dst.write(src.read())
-            logger.info(f"已创建环境变量文件 {env_file}，请检查并编辑配置!")
+    if not _ensure_from_example(config_yaml, Path("config.yaml.example")):
+        logger.error(f"配置文件 {config_yaml} 和示例文件都不存在!")
+        return False
+    
+    _ensure_from_example(Path(".env"), Path(".env.example"))
     
     return True
 
@@ -78,12 +91,11 @@ def check_work_directory():
     
     try:
         # 尝试从YAML配置获取
-        import yaml
+        from yaml_cache import load_yaml_cached
         if Path("config.yaml").exists():
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                config = yaml.safe_load(f)
-                if "olmocr" in config and "work_dir" in config["olmocr"]:
-                    work_dir = config["olmocr"]["work_dir"]
+            config = load_yaml_cached("config.yaml")
+            if "olmocr" in config and "work_dir" in config["olmocr"]:
+                work_dir = config["olmocr"]["work_dir"]
     except Exception as e:
         logger.warning(f"读取YAML配置时出错: {e}")
     
@@ -97,44 +109,51 @@ def check_work_directory():
             logger.error(f"创建工作目录时出错: {e}")
             return False
     
-    # 检查权限
-    try:
-        test_file = work_dir_path / ".write_test"
-        with open(test_file, "w") as f:
-            f.write("test")
-        test_file.unlink()
-        logger.info(f"工作目录权限正常: {work_dir}")
-    except Exception as e:
-        logger.error(f"工作目录权限检查失败: {e}")
+    # 检查权限，access(2)不产生任何写入
+    if not os.access(work_dir_path, os.W_OK):
+        logger.error(f"工作目录权限检查失败: {work_dir} 不可写")
         logger.error(f"请确保用户对工作目录 {work_dir} 有写入权限")
         return False
     
+    # NFS等文件系统上access的结果可能不准确，可设置WORKDIR_WRITE_PROBE=true进行实际写入测试
+    if os.getenv("WORKDIR_WRITE_PROBE", "false").lower() == "true":
+        try:
+            test_file = work_dir_path / ".write_test"
+            with open(test_file, "w") as f:
+                f.write("test")
+            test_file.unlink()
+        except Exception as e:
+            logger.error(f"工作目录权限检查失败: {e}")
+            logger.error(f"请确保用户对工作目录 {work_dir} 有写入权限")
+            return False
+    
+    logger.info(f"工作目录权限正常: {work_dir}")
     return True
 
 def start_service():
     """启动服务"""
     try:
-        import uvicorn
-        from main import app
-        
         # 尝试从配置获取主机和端口
         host = os.getenv("APP_HOST", "0.0.0.0")
         port = int(os.getenv("APP_PORT", "8000"))
         
         # 尝试从YAML配置获取
         try:
-            import yaml
+            from yaml_cache import load_yaml_cached
             if Path("config.yaml").exists():
-                with open("config.yaml", "r", encoding="utf-8") as f:
-                    config = yaml.safe_load(f)
-                    if "app" in config:
-                        if "host" in config["app"]:
-                            host = config["app"]["host"]
-                        if "port" in config["app"]:
-                            port = config["app"]["port"]
+                config = load_yaml_cached("config.yaml")
+                if "app" in config:
+                    if "host" in config["app"]:
+                        host = config["app"]["host"]
+                    if "port" in config["app"]:
+                        port = config["app"]["port"]
         except Exception as e:
             logger.warning(f"读取YAML配置时出错: {e}")
         
+        # 直到真正启动前才导入uvicorn和应用
+        import uvicorn
+        from main import app
+        
         logger.info(f"启动olmOCR API服务，监听地址: {host}:{port}")
         uvicorn.run(app, host=host, port=port)
     except Exception as e:
@@ -145,6 +164,7 @@ def start_service():
 
 def main():
     """主函数"""
+    setup_startup_logging()
     logger.info("正在启动olmOCR API服务...")
     
     # 检查当前目录
@@ -1,19 +1,16 @@
 import os
-import yaml
 import logging
+from logging.handlers import RotatingFileHandler
+from functools import cache
 from pathlib import Path
+from dataclasses import dataclass, fields
 from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
 
-# 尝试导入dotenv，如果不可用则跳过
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    print("python-dotenv not installed, skipping .env loading")
+from yaml_cache import load_yaml_cached
 
-# 配置模型
-class AppConfig(BaseModel):
+# 配置模型，只是从YAML字典到属性的容器，不需要pydantic校验
+@dataclass(slots=True, frozen=True)
+class AppConfig:
     title: str
     description: str
     version: str
@@ -21,29 +18,42 @@ class AppConfig(BaseModel):
     port: int
     debug: bool
 
-class SecurityConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class SecurityConfig:
     secret_key: str
     algorithm: str
     access_token_expire_minutes: int
+    login_rate_limit: str = "10/minute"
 
-class UserConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class UserConfig:
     username: str
     password: str
 
-class OlmocrConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class OlmocrConfig:
     work_dir: str
     pipeline_options: Dict[str, Any]
+    workers: int = 1
 
-class UploadConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class UploadConfig:
     allowed_extensions: List[str]
     max_file_size_mb: int
 
-class LoggingConfig(BaseModel):
+@dataclass(slots=True, frozen=True)
+class LoggingConfig:
     level: str
     file: str
     format: str
 
-class Config(BaseModel):
+def _from_dict(cls, data: Dict[str, Any]):
+    """由字典构造配置对象，忽略未知字段"""
+    names = {f.name for f in fields(cls)}
+    return cls(**{k: v for k, v in data.items() if k in names})
+
+@dataclass(slots=True, frozen=True)
+class Config:
     app: AppConfig
     security: SecurityConfig
     users: List[UserConfig]
@@ -51,17 +61,34 @@ class Config(BaseModel):
     upload: UploadConfig
     logging: LoggingConfig
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Config":
+        return cls(
+            app=_from_dict(AppConfig, data["app"]),
+            security=_from_dict(SecurityConfig, data["security"]),
+            users=[_from_dict(UserConfig, user) for user in data["users"]],
+            olmocr=_from_dict(OlmocrConfig, data["olmocr"]),
+            upload=_from_dict(UploadConfig, data["upload"]),
+            logging=_from_dict(LoggingConfig, data["logging"]),
+        )
+
 # 加载配置
 def load_config() -> Config:
     """加载配置文件和环境变量"""
+    # 首次加载配置时才读取.env，导入本模块不产生副作用；dotenv不可用则跳过
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        print("python-dotenv not installed, skipping .env loading")
+    
     # 默认配置文件路径
     config_path = Path(os.getenv("CONFIG_PATH", "config.yaml"))
     
     # 如果配置文件存在，从文件加载配置
     if config_path.exists():
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config_data = yaml.safe_load(f)
+            config_data = load_yaml_cached(config_path)
         except Exception as e:
             print(f"Error loading config file: {e}")
             config_data = create_default_config()
@@ -69,53 +96,54 @@ def load_config() -> Config:
         # 否则使用默认配置
         config_data = create_default_config()
     
-    # 环境变量覆盖配置文件
-    override_config_with_env(config_data)
-    
     try:
-        return Config(**config_data)
+        # 环境变量覆盖配置文件
+        override_config_with_env(config_data)
+        return Config.from_dict(config_data)
     except Exception as e:
         print(f"Error validating config: {e}")
         # 如果验证失败，使用最小配置
-        return Config(**create_minimal_config())
+        return Config.from_dict(create_minimal_config())
 
 def create_default_config() -> Dict[str, Any]:
-    """创建默认配置"""
+    """创建默认配置，环境变量由override_config_with_env统一覆盖"""
     return {
         "app": {
             "title": "olmOCR API",
             "description": "用于PDF和图像文档OCR处理的API接口",
             "version": "1.0.0",
-            "host": os.getenv("APP_HOST", "0.0.0.0"),
-            "port": int(os.getenv("APP_PORT", "8000")),
-            "debug": os.getenv("DEBUG", "false").lower() == "true",
+            "host": "0.0.0.0",
+            "port": 8000,
+            "debug": False,
         },
         "security": {
-            "secret_key": os.getenv("SECRET_KEY", "your_secret_key_here"),
+            "secret_key": "your_secret_key_here",
             "algorithm": "HS256",
-            "access_token_expire_minutes": int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")),
+            "access_token_expire_minutes": 30,
+            "login_rate_limit": "10/minute",
         },
         "users": [
             {
-                "username": os.getenv("ADMIN_USERNAME", "admin"),
-                "password": os.getenv("ADMIN_PASSWORD", "secret"),
+                "username": "admin",
+                "password": "secret",
             }
         ],
         "olmocr": {
-            "work_dir": os.getenv("WORK_DIR", "./olmocr_workdir"),
+            "work_dir": "./olmocr_workdir",
             "pipeline_options": {
                 "markdown": True,
                 "extract_tables": True,
                 "extract_figures": True,
             },
+            "workers": 1,
         },
         "upload": {
             "allowed_extensions": [".pdf", ".png", ".jpg", ".jpeg"],
             "max_file_size_mb": 50,
         },
         "logging": {
-            "level": os.getenv("LOG_LEVEL", "INFO"),
-            "file": os.getenv("LOG_FILE", "olmocr_api.log"),
+            "level": "INFO",
+            "file": "olmocr_api.log",
             "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         },
     }
@@ -135,6 +163,7 @@ def create_minimal_config() -> Dict[str, Any]:
             "secret_key": "fallback_secret_key",
             "algorithm": "HS256",
             "access_token_expire_minutes": 30,
+            "login_rate_limit": "10/minute",
         },
         "users": [
             {
@@ -147,6 +176,7 @@ def create_minimal_config() -> Dict[str, Any]:
             "pipeline_options": {
                 "markdown": True,
             },
+            "workers": 1,
         },
         "upload": {
             "allowed_extensions": [".pdf", ".png", ".jpg", ".jpeg"],
@@ -159,121 +189,109 @@ def create_minimal_config() -> Dict[str, Any]:
         },
     }
 
+def _parse_bool(value: str) -> bool:
+    return value.lower() == "true"
+
+# 环境变量覆盖表: (变量名, 配置路径, 类型转换)
+_ENV_MAP = [
+    # 应用设置
+    ("APP_HOST", ("app", "host"), str),
+    ("APP_PORT", ("app", "port"), int),
+    ("DEBUG", ("app", "debug"), _parse_bool),
+    # 安全设置
+    ("SECRET_KEY", ("security", "secret_key"), str),
+    ("ACCESS_TOKEN_EXPIRE_MINUTES", ("security", "access_token_expire_minutes"), int),
+    ("LOGIN_RATE_LIMIT", ("security", "login_rate_limit"), str),
+    # olmocr设置
+    ("WORK_DIR", ("olmocr", "work_dir"), str),
+    ("OLMOCR_WORKERS", ("olmocr", "workers"), int),
+    # 日志设置
+    ("LOG_LEVEL", ("logging", "level"), str),
+    ("LOG_FILE", ("logging", "file"), str),
+]
+
+def _set(config_data: Dict[str, Any], path: tuple, value: Any) -> None:
+    """按路径设置嵌套配置项"""
+    *parents, key = path
+    node = config_data
+    for name in parents:
+        node = node.setdefault(name, {})
+    node[key] = value
+
 def override_config_with_env(config_data: Dict[str, Any]) -> None:
     """使用环境变量覆盖配置"""
-    # 应用设置
-    if os.getenv("APP_HOST"):
-        config_data["app"]["host"] = os.getenv("APP_HOST")
-    if os.getenv("APP_PORT"):
-        config_data["app"]["port"] = int(os.getenv("APP_PORT"))
-    if os.getenv("DEBUG"):
-        config_data["app"]["debug"] = os.getenv("DEBUG").lower() == "true"
+    # 只读取一次环境变量快照
+    env = dict(os.environ)
     
-    # 安全设置
-    if os.getenv("SECRET_KEY"):
-        config_data["security"]["secret_key"] = os.getenv("SECRET_KEY")
-    if os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"):
-        config_data["security"]["access_token_expire_minutes"] = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+    for key, path, cast in _ENV_MAP:
+        value = env.get(key)
+        if value:
+            _set(config_data, path, cast(value))
     
     # 用户设置
-    if os.getenv("ADMIN_USERNAME") and os.getenv("ADMIN_PASSWORD"):
-        admin_found = False
-        for user in config_data["users"]:
+    username = env.get("ADMIN_USERNAME")
+    password = env.get("ADMIN_PASSWORD")
+    users = config_data.setdefault("users", [])
+    # 配置文件中users格式不正确时不覆盖，由配置验证回退到最小配置
+    if not (isinstance(users, list) and all(isinstance(user, dict) for user in users)):
+        return
+    if username or password:
+        # 只设置其中一个时也作用于默认的admin用户
+        for user in users:
             if user["username"] == "admin":
-                user["username"] = os.getenv("ADMIN_USERNAME")
-                user["password"] = os.getenv("ADMIN_PASSWORD")
-                admin_found = True
+                if username:
+                    user["username"] = username
+                if password:
+                    user["password"] = password
                 break
-        if not admin_found:
-            config_data["users"].append({
-                "username": os.getenv("ADMIN_USERNAME"),
-                "password": os.getenv("ADMIN_PASSWORD")
-            })
-    
-    # olmocr设置
-    if os.getenv("WORK_DIR"):
-        config_data["olmocr"]["work_dir"] = os.getenv("WORK_DIR")
-    
-    # 日志设置
-    if os.getenv("LOG_LEVEL"):
-        config_data["logging"]["level"] = os.getenv("LOG_LEVEL")
-    if os.getenv("LOG_FILE"):
-        config_data["logging"]["file"] = os.getenv("LOG_FILE")
+        else:
+            if username and password:
+                users.append({
+                    "username": username,
+                    "password": password
+                })
+
+# 日志文件轮转设置
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
 
 # 设置日志
 def setup_logging(config: LoggingConfig) -> None:
-    """设置日志"""
+    """设置日志，进程内只安装一次处理器"""
+    if logging.root.handlers:
+        return
+    
     log_level = getattr(logging, config.level.upper(), logging.INFO)
+    formatter = logging.Formatter(config.format)
     
-    # 配置根日志记录器
-    logging.basicConfig(
-        level=log_level,
-        format=config.format,
-        handlers=[
-            logging.FileHandler(config.file, encoding='utf-8'),
-            logging.StreamHandler(),
-        ]
+    # 延迟到首次写入时才打开日志文件
+    file_handler = RotatingFileHandler(
+        config.file,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True,
     )
+    stream_handler = logging.StreamHandler()
+    
+    # 配置根日志记录器
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        logging.root.addHandler(handler)
+    logging.root.setLevel(log_level)
 
-try:
-    # 全局配置实例
-    config = load_config()
+# 按需导出的配置分区
+_EXPORTS = {"APP", "SECURITY", "USERS", "OLMOCR", "UPLOAD", "LOGGING"}
 
-    # 设置日志
+@cache
+def _get_config() -> Config:
+    """首次访问时加载配置并设置日志"""
+    config = load_config()
     setup_logging(config.logging)
+    return config
 
-    # 导出配置
-    APP = config.app
-    SECURITY = config.security
-    USERS = config.users
-    OLMOCR = config.olmocr
-    UPLOAD = config.upload
-    LOGGING = config.logging
-except Exception as e:
-    print(f"Error initializing config: {e}")
-    # 创建一个简单的命名空间作为回退
-    class SimpleNamespace:
-        pass
-    
-    APP = SimpleNamespace()
-    APP.title = "olmOCR API"
-    APP.description = "API Interface"
-    APP.version = "1.0.0"
-    APP.host = "0.0.0.0"
-    APP.port = 8000
-    APP.debug = False
-    
-    SECURITY = SimpleNamespace()
-    SECURITY.secret_key = "fallback_secret_key"
-    SECURITY.algorithm = "HS256"
-    SECURITY.access_token_expire_minutes = 30
-    
-    class UserConfig:
-        def __init__(self, username, password):
-            self.username = username
-            self.password = password
-    
-    USERS = [UserConfig("admin", "secret")]
-    
-    OLMOCR = SimpleNamespace()
-    OLMOCR.work_dir = "./olmocr_workdir"
-    OLMOCR.pipeline_options = {"markdown": True}
-    
-    UPLOAD = SimpleNamespace()
-    UPLOAD.allowed_extensions = [".pdf", ".png", ".jpg", ".jpeg"]
-    UPLOAD.max_file_size_mb = 50
-    
-    LOGGING = SimpleNamespace()
-    LOGGING.level = "INFO"
-    LOGGING.file = "olmocr_api.log"
-    LOGGING.format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    
-    # 设置基本日志
-    logging.basicConfig(
-        level=logging.INFO,
-        format=LOGGING.format,
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(LOGGING.file, encoding='utf-8'),
-        ]
-    )
+def __getattr__(name: str) -> Any:
+    # 导入本模块时不加载配置，访问APP、OLMOCR等分区时才加载
+    if name in _EXPORTS:
+        return getattr(_get_config(), name.lower())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,31 @@
 import os
-import uuid
+import sys
 import shutil
+import time
+import hashlib
+import secrets
 import asyncio
 import logging
-import tempfile
+import threading
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional
 from pathlib import Path
 
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Request
+import aiofiles
+from cachetools import TTLCache
+from limits import parse_many
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from starlette.formparsers import MultiPartParser
+
+from task_store import TaskStore
 
 # 导入配置
 try:
@@ -38,6 +50,7 @@ except ImportError:
     SECURITY.secret_key = "your_secret_key_here"
     SECURITY.algorithm = "HS256"
     SECURITY.access_token_expire_minutes = 30
+    SECURITY.login_rate_limit = "10/minute"
     
     class UserConfig:
         def __init__(self, username, password):
@@ -49,6 +62,7 @@ except ImportError:
     OLMOCR = SimpleNamespace()
     OLMOCR.work_dir = "./olmocr_workdir"
     OLMOCR.pipeline_options = {"markdown": True, "extract_tables": True, "extract_figures": True}
+    OLMOCR.workers = 1
     
     UPLOAD = SimpleNamespace()
     UPLOAD.allowed_extensions = [".pdf", ".png", ".jpg", ".jpeg"]
@@ -59,28 +73,44 @@ except ImportError:
     LOGGING.file = "olmocr_api.log"
     LOGGING.format = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-# 设置日志记录器
-logging.basicConfig(
-    level=getattr(logging, LOGGING.level.upper(), logging.INFO),
-    format=LOGGING.format,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler(LOGGING.file, encoding='utf-8'),
-    ]
-)
+# 日志处理器由config.setup_logging统一安装
 logger = logging.getLogger(__name__)
 
 # 创建工作目录
 work_dir = Path(OLMOCR.work_dir)
 work_dir.mkdir(exist_ok=True)
 
+# 旧版FastAPI用orjson序列化更快；新版已按response_model直接用pydantic序列化为JSON，
+# ORJSONResponse被标记弃用且反而更慢，此时使用默认的JSONResponse
+DEFAULT_RESPONSE_CLASS = JSONResponse if hasattr(ORJSONResponse, "__deprecated__") else ORJSONResponse
+
 # 创建应用
 app = FastAPI(
     title=APP.title,
     description=APP.description,
     version=APP.version,
+    default_response_class=DEFAULT_RESPONSE_CLASS,
 )
 
+# 按客户端IP限制登录频率，防止密码哈希计算被用来耗尽CPU
+DEFAULT_LOGIN_RATE_LIMIT = "10/minute"
+
+def login_rate_limit() -> str:
+    """校验配置的登录频率限制，格式错误时slowapi会放行所有请求，因此回退到默认值"""
+    try:
+        parse_many(SECURITY.login_rate_limit)
+    except (TypeError, ValueError):
+        logger.error(
+            f"登录频率限制配置无效: {SECURITY.login_rate_limit!r}，使用默认值 {DEFAULT_LOGIN_RATE_LIMIT}"
+        )
+        return DEFAULT_LOGIN_RATE_LIMIT
+    return SECURITY.login_rate_limit
+
+LOGIN_RATE_LIMIT = login_rate_limit()
+limiter = Limiter(key_func=get_remote_address)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -91,23 +121,34 @@ app.add_middleware(
 )
 
 # 任务状态存储
-TASKS = {}
-
-# 密码上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+TASKS = TaskStore(work_dir / "tasks.db")
+
+# 允许的文件扩展名（统一小写），以及对应的错误提示
+_ALLOWED_EXT = frozenset(ext.lower() for ext in UPLOAD.allowed_extensions)
+_UNSUPPORTED_FORMAT_DETAIL = f"不支持的文件格式，仅支持: {', '.join(UPLOAD.allowed_extensions)}"
+
+# 上传复制与结果读取的块大小
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+# 框架将不超过此大小的上传文件保存在内存中
+UPLOAD_SPOOL_MAX_SIZE = getattr(MultiPartParser, "spool_max_size", 1024 * 1024)
+RESULT_CHUNK_SIZE = 64 * 1024
+
+# 密码上下文，首次使用时才加载passlib及哈希后端
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    # 新哈希使用argon2id，已有的bcrypt哈希在下次登录成功时自动升级
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=10,
+        argon2__rounds=2,
+        argon2__memory_cost=19456,
+    )
 
 # OAuth2 Bearer令牌
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# 用户数据库 - 内存存储
-fake_users_db = {}
-for user in USERS:
-    # 直接存储密码，登录时再哈希
-    fake_users_db[user.username] = {
-        "username": user.username,
-        "hashed_password": user.password
-    }
-
 # 模型定义
 class Token(BaseModel):
     access_token: str
@@ -133,65 +174,142 @@ class OCRStatus(BaseModel):
     error: Optional[str] = None
     created_at: str
 
-class OCRResult(BaseModel):
-    task_id: str
-    text: str
-    metadata: Dict[str, Any] = {}
+# 用户数据库 - 内存存储，启动时构建好UserInDB实例，查询时无需再校验
+fake_users_db = {}
+for user in USERS:
+    # 明文密码在加载时哈希一次，避免登录时再处理
+    hashed_password = user.password
+    if get_pwd_context().identify(hashed_password, required=False) is None:
+        hashed_password = get_pwd_context().hash(hashed_password)
+    fake_users_db[user.username] = UserInDB(
+        username=user.username,
+        hashed_password=hashed_password
+    )
+
+# 时间戳按秒缓存，同一秒内的请求共用格式化结果
+@lru_cache(maxsize=2)
+def _iso(ts_int: int) -> str:
+    return datetime.fromtimestamp(ts_int).isoformat()
+
+def now_iso() -> str:
+    return _iso(int(time.time()))
+
+# 校验成功的密码缓存，重复登录时跳过哈希计算；失败结果不缓存
+_pw_cache = TTLCache(maxsize=1024, ttl=60)
+_pw_cache_lock = threading.Lock()
 
 # 安全函数
 def verify_password(plain_password, hashed_password):
-    # 如果密码是明文存储的，直接比较
-    if not hashed_password.startswith("$2b$"):
-        return plain_password == hashed_password
-    # 否则使用bcrypt验证
-    return pwd_context.verify(plain_password, hashed_password)
+    key = hashlib.sha256(plain_password.encode() + b"|" + hashed_password.encode()).digest()
+    with _pw_cache_lock:
+        if key in _pw_cache:
+            return True
+    if not get_pwd_context().verify(plain_password, hashed_password):
+        return False
+    with _pw_cache_lock:
+        _pw_cache[key] = True
+    return True
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def get_user(db, username: str):
-    if username in db:
-        user_dict = db[username]
-        return UserInDB(**user_dict)
-    return None
+    return db.get(username)
 
-def authenticate_user(db, username: str, password: str):
+async def authenticate_user(db, username: str, password: str):
     user = get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # 密码校验是CPU密集操作，放到线程中执行以免阻塞事件循环
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return False
+    # 旧方案或旧参数的哈希在登录成功后重新生成
+    if get_pwd_context().needs_update(user.hashed_password):
+        user.hashed_password = await asyncio.to_thread(get_password_hash, password)
+        logger.info(f"用户 {username} 的密码哈希已升级")
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    import jwt
+
     to_encode = data.copy()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = int(time.time() + expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = int(time.time()) + 15 * 60
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECURITY.secret_key, algorithm=SECURITY.algorithm)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
+# 认证失败的响应头，异常只在失败时创建；复用同一异常实例会使其traceback不断累积
+CREDENTIALS_HEADERS = {"WWW-Authenticate": "Bearer"}
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
-        headers={"WWW-Authenticate": "Bearer"},
+        headers=CREDENTIALS_HEADERS,
     )
+
+# 认证结果缓存: sha256(令牌) -> (用户, 过期时间)，失败结果不缓存
+# 只在事件循环中读写，检查与写入之间没有await，无需加锁
+_jwt_cache = TTLCache(maxsize=10_000, ttl=5)
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    import jwt
+
+    key = hashlib.sha256(token.encode()).digest()
+    entry = _jwt_cache.get(key)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+    
     try:
         payload = jwt.decode(token, SECURITY.secret_key, algorithms=[SECURITY.algorithm])
         username: str = payload.get("sub")
         if username is None:
-            raise credentials_exception
+            raise credentials_exception()
         token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
+    except jwt.InvalidTokenError:
+        raise credentials_exception()
     user = get_user(fake_users_db, username=token_data.username)
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _jwt_cache[key] = (user, exp)
     return user
 
+# olmocr命令模板，配置在运行期间不变，导入时生成一次
+# 使用当前解释器启动，保证子进程与服务运行在同一虚拟环境中
+_CMD_PREFIX = (sys.executable, "-m", "olmocr.pipeline")
+_OLMOCR_FLAGS = tuple(
+    flag
+    for option, flag in [
+        ("markdown", "--markdown"),
+        ("extract_tables", "--extract_tables"),
+        ("extract_figures", "--extract_figures"),
+    ]
+    if OLMOCR.pipeline_options.get(option, True)
+)
+
+def find_markdown_file(markdown_dir: Path) -> Optional[Path]:
+    """查找结果markdown文件，olmocr通常直接输出在顶层目录，找不到时再递归查找"""
+    if not markdown_dir.exists():
+        return None
+    with os.scandir(markdown_dir) as it:
+        md_file = next((Path(e.path) for e in it if e.is_file() and e.name.endswith(".md")), None)
+    if md_file is None:
+        md_file = next(markdown_dir.rglob("*.md"), None)
+    return md_file
+
+# 处理任务的worker数，即同时运行的olmocr进程数上限
+PIPELINE_CONCURRENCY = max(1, min(os.cpu_count() or 1, OLMOCR.workers))
+# 等待处理的任务队列上限，队列满时拒绝新的上传
+TASK_QUEUE_SIZE = 128
+# 服务关闭时等待olmocr进程退出的秒数，超时后强制结束
+PIPELINE_TERMINATE_TIMEOUT = 10
+
 # olmocr处理函数
 async def process_document(task_id: str, file_path: str):
     try:
@@ -199,27 +317,12 @@ async def process_document(task_id: str, file_path: str):
         workspace_path = work_dir / task_id
         workspace_path.mkdir(exist_ok=True)
         
-        # 更新任务状态
-        TASKS[task_id]["status"] = "processing"
-        logger.info(f"开始处理任务 {task_id}, 文件路径: {file_path}")
-        
         # 构建命令
-        cmd = [
-            "python", "-m", "olmocr.pipeline",
-            str(workspace_path),
-        ]
-        
-        # 添加配置选项
-        if OLMOCR.pipeline_options.get("markdown", True):
-            cmd.append("--markdown")
-        if OLMOCR.pipeline_options.get("extract_tables", True):
-            cmd.append("--extract_tables")
-        if OLMOCR.pipeline_options.get("extract_figures", True):
-            cmd.append("--extract_figures")
-        
-        # 添加文件路径
-        cmd.extend(["--pdfs", file_path])
+        cmd = [*_CMD_PREFIX, str(workspace_path), *_OLMOCR_FLAGS, "--pdfs", file_path]
         
+        # 更新任务状态
+        await TASKS.update(task_id, status="processing")
+        logger.info(f"开始处理任务 {task_id}, 文件路径: {file_path}")
         logger.debug(f"执行命令: {' '.join(cmd)}")
         
         # 执行命令
@@ -229,41 +332,99 @@ async def process_document(task_id: str, file_path: str):
             stderr=asyncio.subprocess.PIPE
         )
         
-        stdout, stderr = await process.communicate()
+        try:
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            # 服务关闭时worker被取消，取消不会结束子进程，需自行终止，避免遗留占用GPU的olmocr进程
+            await stop_process(process)
+            logger.warning(f"服务关闭，任务 {task_id} 被中断")
+            await TASKS.update(task_id, status="failed", error="服务关闭中断")
+            raise
         
         if process.returncode != 0:
             logger.error(f"任务 {task_id} 处理失败: {stderr.decode()}")
-            TASKS[task_id]["status"] = "failed"
-            TASKS[task_id]["error"] = stderr.decode()
+            await TASKS.update(task_id, status="failed", error=stderr.decode())
             return
         
         # 查找生成的markdown文件
-        markdown_dir = workspace_path / "markdown"
-        if markdown_dir.exists():
-            markdown_files = list(markdown_dir.glob("**/*.md"))
-            if markdown_files:
-                md_file = markdown_files[0]
-                with open(md_file, "r", encoding="utf-8") as f:
-                    text_content = f.read()
-                
-                logger.info(f"任务 {task_id} 处理完成，结果保存在 {md_file}")
-                TASKS[task_id]["status"] = "completed"
-                TASKS[task_id]["result"] = text_content
-                TASKS[task_id]["result_path"] = str(md_file)
-                return
+        # 目录扫描放到线程中执行，避免输出文件较多时阻塞事件循环
+        md_file = await asyncio.to_thread(find_markdown_file, workspace_path / "markdown")
+        if md_file is not None:
+            logger.info(f"任务 {task_id} 处理完成，结果保存在 {md_file}")
+            await TASKS.update(task_id, status="completed", result_path=str(md_file))
+            return
         
         logger.error(f"任务 {task_id} 处理完成但未找到结果文件")
-        TASKS[task_id]["status"] = "failed"
-        TASKS[task_id]["error"] = "处理完成但未找到结果文件"
+        await TASKS.update(task_id, status="failed", error="处理完成但未找到结果文件")
     except Exception as e:
         logger.exception(f"任务 {task_id} 处理异常: {str(e)}")
-        TASKS[task_id]["status"] = "failed"
-        TASKS[task_id]["error"] = str(e)
+        await TASKS.update(task_id, status="failed", error=str(e))
+
+async def stop_process(process: asyncio.subprocess.Process) -> None:
+    """先请求子进程退出，超时后强制结束"""
+    if process.returncode is not None:
+        return
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), PIPELINE_TERMINATE_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+async def ocr_worker(queue: asyncio.Queue):
+    """从队列中依次取出任务处理"""
+    while True:
+        task_id, file_path = await queue.get()
+        try:
+            await process_document(task_id, file_path)
+        except Exception:
+            # 单个任务出错(如更新任务状态失败)不能终止worker，否则队列会停滞
+            logger.exception(f"worker处理任务 {task_id} 时出错")
+        finally:
+            queue.task_done()
+
+def upload_size(file: UploadFile) -> int:
+    """获取已接收的上传文件大小"""
+    if file.size is not None:
+        return file.size
+    pos = file.file.tell()
+    file.file.seek(0, os.SEEK_END)
+    size = file.file.tell()
+    file.file.seek(pos)
+    return size
+
+def save_upload(src, dst_path: Path, size: int) -> None:
+    """将框架暂存的上传文件复制到目标路径，Linux上用sendfile在内核中完成复制"""
+    src.seek(0)
+    with open(dst_path, "wb") as dst:
+        # 小文件仍在内存中，此时fileno()会先把内容写入临时文件，直接复制更快
+        if sys.platform.startswith("linux") and size > UPLOAD_SPOOL_MAX_SIZE:
+            try:
+                src_fd = src.fileno()
+            except (AttributeError, OSError):
+                src_fd = None
+            if src_fd is not None:
+                offset = 0
+                while True:
+                    sent = os.sendfile(dst.fileno(), src_fd, offset, UPLOAD_CHUNK_SIZE)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+def file_too_large(username: str, file_size: int) -> HTTPException:
+    logger.warning(f"用户 {username} 上传了过大的文件: {file_size/(1024*1024):.2f}MB")
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"文件大小超过限制，最大允许: {UPLOAD.max_file_size_mb}MB"
+    )
 
 # API路由
 @app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(fake_users_db, form_data.username, form_data.password)
+@limiter.limit(LOGIN_RATE_LIMIT)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    user = await authenticate_user(fake_users_db, form_data.username, form_data.password)
     if not user:
         logger.warning(f"登录失败: 用户名 {form_data.username} 认证失败")
         raise HTTPException(
@@ -283,88 +444,77 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @app.post("/ocr/upload", response_model=OCRStatus)
-async def upload_document(background_tasks: BackgroundTasks, file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
+async def upload_document(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
     # 验证文件类型
-    filename = file.filename.lower()
-    file_ext = Path(filename).suffix
-    if file_ext not in UPLOAD.allowed_extensions:
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    if file_ext not in _ALLOWED_EXT:
         logger.warning(f"用户 {current_user.username} 上传了不支持的文件类型: {file_ext}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"不支持的文件格式，仅支持: {', '.join(UPLOAD.allowed_extensions)}"
+            detail=_UNSUPPORTED_FORMAT_DETAIL
         )
     
-    # 检查文件大小
-    file_size = 0
-    chunk_size = 1024 * 1024  # 1MB
+    # 框架在调用处理函数前已接收完整个文件，超过大小限制时直接拒绝，不写入磁盘
+    file_size = upload_size(file)
+    if file_size > UPLOAD.max_file_size_mb * 1024 * 1024:
+        raise file_too_large(current_user.username, file_size)
     
-    # 创建临时文件
-    temp_file = tempfile.NamedTemporaryFile(delete=False)
+    # 生成任务ID
+    task_id = secrets.token_urlsafe(16)
+    
+    # 复制到最终文件
+    file_path = work_dir / f"{task_id}_{file.filename}"
     try:
-        # 读取并写入临时文件，同时计算大小
-        while True:
-            chunk = await file.read(chunk_size)
-            if not chunk:
-                break
-            file_size += len(chunk)
-            if file_size > UPLOAD.max_file_size_mb * 1024 * 1024:
-                temp_file.close()
-                os.unlink(temp_file.name)
-                logger.warning(f"用户 {current_user.username} 上传了过大的文件: {file_size/(1024*1024):.2f}MB")
-                raise HTTPException(
-                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                    detail=f"文件大小超过限制，最大允许: {UPLOAD.max_file_size_mb}MB"
-                )
-            temp_file.write(chunk)
-        
-        temp_file.close()
-        
-        # 生成任务ID
-        task_id = str(uuid.uuid4())
-        
-        # 保存上传的文件
-        file_path = work_dir / f"{task_id}_{file.filename}"
-        shutil.copy(temp_file.name, file_path)
-        
-        logger.info(f"用户 {current_user.username} 上传文件 {file.filename}，创建任务 {task_id}")
-        
-        # 创建任务记录
-        TASKS[task_id] = {
-            "status": "queued",
-            "file_path": str(file_path),
-            "created_at": datetime.now().isoformat(),
-            "result": None,
-            "result_path": None,
-            "error": None,
-            "user": current_user.username
-        }
-        
-        # 后台处理文档
-        background_tasks.add_task(process_document, task_id, str(file_path))
-        
-        return OCRStatus(
-            task_id=task_id,
-            status="queued",
-            created_at=TASKS[task_id]["created_at"]
+        await asyncio.to_thread(save_upload, file.file, file_path, file_size)
+    except BaseException:
+        # 保存失败时删除不完整的文件
+        file_path.unlink(missing_ok=True)
+        raise
+    
+    logger.info(f"用户 {current_user.username} 上传文件 {file.filename}，创建任务 {task_id}")
+    
+    # 创建任务记录
+    created_at = now_iso()
+    await TASKS.set(task_id, {
+        "status": "queued",
+        "file_path": str(file_path),
+        "created_at": created_at,
+        "result_path": None,
+        "error": None,
+        "user": current_user.username
+    })
+    
+    # 加入处理队列
+    try:
+        app.state.task_q.put_nowait((task_id, str(file_path)))
+    except asyncio.QueueFull:
+        logger.warning(f"任务队列已满，拒绝任务 {task_id}")
+        await TASKS.update(task_id, status="failed", error="任务队列已满")
+        file_path.unlink(missing_ok=True)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="服务繁忙，请稍后重试"
         )
-    finally:
-        # 确保临时文件被删除
-        try:
-            os.unlink(temp_file.name)
-        except:
-            pass
+    
+    return OCRStatus.model_construct(
+        task_id=task_id,
+        status="queued",
+        created_at=created_at
+    )
+
+# 任务状态对应的进度
+_PROGRESS = {"completed": 1.0, "processing": 0.5, "queued": 0.0, "failed": 0.0}
 
 @app.get("/ocr/status/{task_id}", response_model=OCRStatus)
 async def get_task_status(task_id: str, current_user: User = Depends(get_current_user)):
-    if task_id not in TASKS:
+    task = await TASKS.get(task_id)
+    if task is None:
         logger.warning(f"用户 {current_user.username} 查询不存在的任务 {task_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="任务不存在"
         )
     
-    task = TASKS[task_id]
-    
     # 检查任务所有权（可选）
     if "user" in task and task["user"] != current_user.username:
         logger.warning(f"用户 {current_user.username} 尝试访问其他用户的任务 {task_id}")
@@ -374,26 +524,26 @@ async def get_task_status(task_id: str, current_user: User = Depends(get_current
         )
     
     logger.debug(f"用户 {current_user.username} 查询任务 {task_id} 状态: {task['status']}")
-    return OCRStatus(
+    # 字段均由服务端生成，跳过pydantic校验
+    return OCRStatus.model_construct(
         task_id=task_id,
         status=task["status"],
-        progress=1.0 if task["status"] == "completed" else (0.5 if task["status"] == "processing" else 0.0),
+        progress=_PROGRESS.get(task["status"], 0.0),
         result_path=task.get("result_path"),
         error=task.get("error"),
         created_at=task["created_at"]
     )
 
-@app.get("/ocr/result/{task_id}", response_model=OCRResult)
+@app.get("/ocr/result/{task_id}")
 async def get_task_result(task_id: str, current_user: User = Depends(get_current_user)):
-    if task_id not in TASKS:
+    task = await TASKS.get(task_id)
+    if task is None:
         logger.warning(f"用户 {current_user.username} 查询不存在的任务结果 {task_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="任务不存在"
         )
     
-    task = TASKS[task_id]
-    
     # 检查任务所有权（可选）
     if "user" in task and task["user"] != current_user.username:
         logger.warning(f"用户 {current_user.username} 尝试访问其他用户的任务结果 {task_id}")
@@ -409,23 +559,36 @@ async def get_task_result(task_id: str, current_user: User = Depends(get_current
             detail=f"任务尚未完成，当前状态: {task['status']}"
         )
     
-    if not task.get("result"):
+    result_path = task.get("result_path")
+    if not result_path:
         logger.error(f"任务 {task_id} 标记为完成但结果不存在")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="结果不存在"
         )
     
+    # 在返回响应前打开文件，结果文件被删除时返回404而不是中断的200响应
+    try:
+        f = await aiofiles.open(result_path, "rb")
+    except FileNotFoundError:
+        logger.error(f"任务 {task_id} 的结果文件 {result_path} 不存在")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="结果不存在"
+        )
+    
+    async def iter_file():
+        try:
+            while True:
+                chunk = await f.read(RESULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            await f.close()
+    
     logger.info(f"用户 {current_user.username} 获取任务 {task_id} 结果")
-    return OCRResult(
-        task_id=task_id,
-        text=task["result"],
-        metadata={
-            "created_at": task["created_at"],
-            "file_path": task["file_path"],
-            "result_path": task["result_path"]
-        }
-    )
+    return StreamingResponse(iter_file(), media_type="text/markdown; charset=utf-8")
 
 @app.get("/")
 async def root():
@@ -433,12 +596,34 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    return {"status": "ok", "timestamp": now_iso()}
 
 @app.on_event("startup")
 async def startup_event():
+    # 启动固定数量的worker，限制并发并在队列满时提供背压
+    app.state.task_q = asyncio.Queue(maxsize=TASK_QUEUE_SIZE)
+    app.state.workers = [
+        asyncio.create_task(ocr_worker(app.state.task_q))
+        for _ in range(PIPELINE_CONCURRENCY)
+    ]
+    # 上次运行遗留的任务：排队中的重新入队，处理中的无法续跑，标记为失败
+    for task_id, task in await TASKS.recover(error="服务重启中断"):
+        try:
+            app.state.task_q.put_nowait((task_id, task["file_path"]))
+        except asyncio.QueueFull:
+            await TASKS.update(task_id, status="failed", error="任务队列已满")
+            Path(task["file_path"]).unlink(missing_ok=True)
+        else:
+            logger.info(f"重新排队任务 {task_id}")
     logger.info(f"{APP.title} 启动成功，监听地址: {APP.host}:{APP.port}")
     logger.info(f"工作目录: {work_dir}")
+    logger.info(f"olmocr并发进程数: {PIPELINE_CONCURRENCY}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for worker in app.state.workers:
+        worker.cancel()
+    await asyncio.gather(*app.state.workers, return_exceptions=True)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+# 任务记录默认保留时间（秒）
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+# 不支持WAL共享内存的网络文件系统
+NETWORK_FS_TYPES = frozenset({"nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "fuse.sshfs"})
+
+def _process_start_time(pid: int) -> Optional[str]:
+    """读取进程启动时间(开机后的时钟节拍数)，进程不存在或非Linux时返回None"""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # 进程名中可能有空格和括号，从最后一个右括号之后开始分割，starttime为第22个字段
+    return stat[stat.rindex(b")") + 2:].split()[19].decode()
+
+# pid -> 进程实例标识，fork出的子进程pid不同，会重新生成
+_OWNER_IDS: Dict[int, str] = {}
+
+def _owner_id() -> str:
+    """当前进程的实例标识：pid加进程启动时间，容器重启后复用同一pid也能区分"""
+    pid = os.getpid()
+    owner = _OWNER_IDS.get(pid)
+    if owner is None:
+        owner = f"{pid}:{_process_start_time(pid) or uuid.uuid4().hex}"
+        _OWNER_IDS[pid] = owner
+    return owner
+
+def _owner_alive(owner: Any) -> bool:
+    """判断任务所属进程实例是否仍在运行，无法确认时视为已退出"""
+    if not isinstance(owner, str):
+        return False
+    if owner == _owner_id():
+        return True
+    pid, _, start = owner.partition(":")
+    return pid.isdigit() and _process_start_time(int(pid)) == start
+
+def _on_network_fs(path: Path) -> bool:
+    """根据/proc/mounts判断路径是否位于网络文件系统上"""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+    target = os.path.realpath(path)
+    best, fstype = "", None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        prefix = mount_point.rstrip("/") + "/"
+        if (target == mount_point or target.startswith(prefix)) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype in NETWORK_FS_TYPES
+
+class TaskStore:
+    """基于SQLite的任务存储，多个worker进程共享同一数据库，记录过期后自动清理
+
+    每条记录带有写入进程的实例标识(owner)，进程重启后据此接管其遗留的未完成任务。
+    非Linux系统无法确认其他进程是否存活，此时假定只有单个服务进程。
+    """
+
+    def __init__(self, db_path: Union[str, Path], ttl_seconds: int = DEFAULT_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # 自动提交模式，显式事务只用于读改写
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        # WAL依赖共享内存，NFS等网络文件系统上使用默认的回滚日志
+        if not _on_network_fs(Path(db_path).parent):
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "task_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_expires_at ON tasks (expires_at)")
+
+    def _set(self, task_id: str, task: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, data, expires_at) VALUES (?, ?, ?)",
+                (task_id, json.dumps({**task, "owner": _owner_id()}), now + self.ttl_seconds),
+            )
+
+    def _get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM tasks WHERE task_id = ? AND expires_at > ?",
+                (task_id, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _update(self, task_id: str, fields: Dict[str, Any]) -> None:
+        with self._lock:
+            # 其他进程可能同时更新，读改写放在同一写事务中
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM tasks WHERE task_id = ?", (task_id,)
+                ).fetchone()
+                if row is not None:
+                    task = json.loads(row[0])
+                    task.update(fields)
+                    self._conn.execute(
+                        "UPDATE tasks SET data = ? WHERE task_id = ?",
+                        (json.dumps(task), task_id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _recover(self, error: str) -> List[Tuple[str, Dict[str, Any]]]:
+        owner = _owner_id()
+        requeue = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT task_id, data FROM tasks WHERE expires_at > ? "
+                    "AND json_extract(data, '$.status') IN ('queued', 'processing')",
+                    (time.time(),),
+                ).fetchall()
+                for task_id, data in rows:
+                    task = json.loads(data)
+                    # 所属进程仍在运行的任务由该进程自己处理
+                    if _owner_alive(task.get("owner")):
+                        continue
+                    if task["status"] == "queued":
+                        task["owner"] = owner
+                        requeue.append((task_id, task))
+                    else:
+                        task.update(status="failed", error=error)
+                    self._conn.execute(
+                        "UPDATE tasks SET data = ? WHERE task_id = ?",
+                        (json.dumps(task), task_id),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeue
+
+    async def set(self, task_id: str, task: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._set, task_id, task)
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, task_id)
+
+    async def update(self, task_id: str, **fields) -> None:
+        await asyncio.to_thread(self._update, task_id, fields)
+
+    async def recover(self, error: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """接管已退出进程遗留的任务：处理中的标记为失败，返回需要重新排队的任务"""
+        return await asyncio.to_thread(self._recover, error)
@@ -0,0 +1,40 @@
+import os
+import copy
+from collections import OrderedDict
+from typing import Any, Tuple, Union
+
+import yaml
+
+# 优先使用libyaml实现的C加速加载器
+try:
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+# 缓存上限，超出后淘汰最久未使用的条目
+MAX_CACHE_SIZE = 100
+
+# 路径 -> (st_mtime_ns, st_size, st_ino, 解析结果)
+_CACHE: "OrderedDict[str, Tuple[int, int, int, Any]]" = OrderedDict()
+
+def load_yaml_cached(path: Union[str, os.PathLike]) -> Any:
+    """加载YAML文件，文件未变化时直接返回缓存结果的深拷贝"""
+    key = os.fspath(path)
+    st = os.stat(key)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    entry = _CACHE.get(key)
+    if entry is not None and entry[:3] == signature:
+        _CACHE.move_to_end(key)
+        return copy.deepcopy(entry[3])
+
+    with open(key, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=_SafeLoader)
+
+    _CACHE[key] = (*signature, data)
+    _CACHE.move_to_end(key)
+    if len(_CACHE) > MAX_CACHE_SIZE:
+        _CACHE.popitem(last=False)
+
+    # 调用方可能修改返回值，不能直接交出缓存对象
+    return copy.deepcopy(data)